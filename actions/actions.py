@@ -1,17 +1,186 @@
 import csv
+import functools
+import logging
+import math
 import os
+import re
+import time
 from rapidfuzz import process
 from rasa_sdk import Action, Tracker
 from rasa_sdk.executor import CollectingDispatcher
 from rasa_sdk.events import SlotSet
 from typing import Any, Text, Dict, List
 
+from tracing import tracing_enabled, write_trace_spans
+
+logger = logging.getLogger(__name__)
+
+# Fields the web client's templates can ask for, keyed by payload name
+COURSE_FIELDS = {
+    "description": lambda row: row['description'],
+    "duration": lambda row: row['duration'],
+    "fees": lambda row: row['fees'],
+    "level": lambda row: row['suitable_for'].split('|')[0],
+    "suitable_for": lambda row: split_field(row['suitable_for']),
+    "key_skills": lambda row: split_field(row.get('key_skills')),
+    "career_paths": lambda row: split_field(row.get('career_paths')),
+    "salaries": lambda row: split_field(row.get('job_roles_salary')),
+    "salary": lambda row: (row.get('job_roles_salary') or 'Contact ICTAK').split('|')[0],
+}
+
+
+def course_id(course_name):
+    """Stable slug used by the web client to refer to a course"""
+    return re.sub(r'[^a-z0-9]+', '-', course_name.lower()).strip('-')
+
+
+def split_field(value):
+    """Split a pipe-separated CSV field into a clean list"""
+    return [item.strip() for item in (value or '').split('|') if item.strip()]
+
+
+def course_payload(row, fields=(), skills_limit=None):
+    """Compact dict for a course row with only the requested fields"""
+    payload = {"id": course_id(row['course_name']), "name": row['course_name']}
+    for field in fields:
+        payload[field] = COURSE_FIELDS[field](row)
+    if skills_limit and "key_skills" in payload:
+        payload["key_skills"] = payload["key_skills"][:skills_limit]
+    return payload
+
+
+def wants_structured(tracker):
+    """True when the client (the web app) asked for structured payloads"""
+    metadata = tracker.latest_message.get("metadata")
+    return isinstance(metadata, dict) and metadata.get("structured") is True
+
+
+def send_structured(dispatcher, message_type, buttons=None, **data):
+    """Send a structured payload for the web client to render"""
+    payload = {"type": message_type, **data}
+    if buttons:
+        payload["buttons"] = buttons
+    dispatcher.utter_message(json_message=payload)
+
+
+def traced_action(run):
+    """Record an action's execution time under the turn's trace id"""
+    @functools.wraps(run)
+    def wrapper(self, dispatcher, tracker, domain):
+        if not tracing_enabled():
+            return run(self, dispatcher, tracker, domain)
+
+        metadata = tracker.latest_message.get("metadata")
+        if not isinstance(metadata, dict):
+            metadata = {}
+        trace_id = metadata.get("trace_id")
+
+        if not isinstance(trace_id, str) or not trace_id:
+            return run(self, dispatcher, tracker, domain)
+
+        start = time.time()
+        try:
+            return run(self, dispatcher, tracker, domain)
+        finally:
+            # Tracing must never change what the action returns
+            try:
+                end = time.time()
+                args = {"trace_id": trace_id, "action": self.name()}
+                spans = []
+
+                # For the first action of a turn, the time since the bridge sent
+                # the message was spent in Rasa's NLU and policy prediction
+                sent_at = metadata.get("trace_sent_at")
+                if (isinstance(sent_at, (int, float)) and not isinstance(sent_at, bool)
+                        and tracker.latest_action_name == "action_listen"):
+                    spans.append(("rasa nlu/policy", sent_at, start, args))
+
+                spans.append((f"action {self.name()}", start, end, args))
+                write_trace_spans(spans, "action server", "action_server")
+            except Exception as e:
+                logger.warning(f"Could not record trace spans: {e}")
+
+    return wrapper
+
+
+# Number of neighbours kept per course in the similarity index
+SIMILAR_COURSES_LIMIT = 3
+
+# Weaker matches than this are not worth suggesting
+SIMILAR_COURSES_MIN_SCORE = 0.1
+
+# focus_areas is a curated keyword list, so it counts more than skills/careers
+FEATURE_WEIGHTS = {"focus_areas": 2.0, "key_skills": 1.0, "career_paths": 1.0}
+
+SIMILARITY_STOPWORDS = {"a", "an", "and", "for", "in", "of", "the", "to", "with"}
+
+# Similarity index, rebuilt only when course_data.csv changes
+_similarity_cache = {"version": None, "index": {}}
+
+
+def course_features(row):
+    """Sparse weighted word vector built from focus areas, skills and careers"""
+    features = {}
+    for field, weight in FEATURE_WEIGHTS.items():
+        for word in re.findall(r"[a-z0-9+#]+", (row.get(field) or '').lower()):
+            if len(word) > 1 and word not in SIMILARITY_STOPWORDS:
+                features[word] = features.get(word, 0) + weight
+    return features
+
+
+def build_similarity_index(rows, limit=SIMILAR_COURSES_LIMIT,
+                           min_score=SIMILAR_COURSES_MIN_SCORE):
+    """Map each course name (lowercase) to its top-k (row, cosine score) neighbours"""
+    vectors = [course_features(row) for row in rows]
+    norms = [math.sqrt(sum(w * w for w in vector.values())) for vector in vectors]
+
+    # Inverted index so only courses sharing a word are compared
+    postings = {}
+    for idx, vector in enumerate(vectors):
+        for word, weight in vector.items():
+            postings.setdefault(word, []).append((idx, weight))
+
+    index = {}
+    for idx, vector in enumerate(vectors):
+        dots = {}
+        for word, weight in vector.items():
+            for other, other_weight in postings[word]:
+                if other != idx:
+                    dots[other] = dots.get(other, 0) + weight * other_weight
+
+        neighbours = []
+        for other, dot in dots.items():
+            score = dot / (norms[idx] * norms[other])
+            if score >= min_score:
+                neighbours.append((rows[other], score))
+
+        neighbours.sort(key=lambda x: x[1], reverse=True)
+        index[rows[idx]['course_name'].lower()] = neighbours[:limit]
+
+    return index
+
+
+def get_similarity_index(csv_path):
+    """Return the cached similarity index for the current catalog version"""
+    stat = os.stat(csv_path)
+    version = (stat.st_mtime_ns, stat.st_size)
+
+    if _similarity_cache["version"] != version:
+        with open(csv_path, "r", encoding="utf-8") as file:
+            rows = list(csv.DictReader(file))
+        _similarity_cache["index"] = build_similarity_index(rows)
+        _similarity_cache["version"] = version
+
+    return _similarity_cache["index"]
+
+
 class ActionViewCourses(Action):
     """Display all available courses with helpful buttons"""
     
     def name(self):
         return "action_view_courses"
 
+    @traced_action
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: dict):
@@ -24,10 +193,12 @@ class ActionViewCourses(Action):
             )
             return []
 
+        rows = []
         courses = []
         with open(csv_path, "r", encoding="utf-8") as file:
             reader = csv.DictReader(file)
             for row in reader:
+                rows.append(row)
                 courses.append({
                     'name': row['course_name'],
                     'duration': row['duration'],
@@ -40,6 +211,22 @@ class ActionViewCourses(Action):
             )
             return []
 
+        # Suggestion buttons
+        buttons = [
+            {"title": "🧭 Help Me Choose", "payload": "/start_course_advisor"},
+            {"title": "🔍 Search Course", "payload": "tell me about"},
+            {"title": "📞 Talk to Counselor", "payload": "/ask_contact"},
+            {"title": "💼 Placement Info", "payload": "/ask_placement"},
+            {"title": "🎓 Scholarships", "payload": "/ask_scholarships"}
+        ]
+
+        if wants_structured(tracker):
+            send_structured(
+                dispatcher, "course_list", buttons,
+                courses=[course_payload(row, ("duration", "level")) for row in rows]
+            )
+            return []
+
         # Build course list with duration and level
         course_items = []
         for idx, course in enumerate(courses, 1):
@@ -56,15 +243,6 @@ class ActionViewCourses(Action):
             "💡 <b>What would you like to do next?</b>"
         )
 
-        # Suggestion buttons
-        buttons = [
-            {"title": "🧭 Help Me Choose", "payload": "/start_course_advisor"},
-            {"title": "🔍 Search Course", "payload": "tell me about"},
-            {"title": "📞 Talk to Counselor", "payload": "/ask_contact"},
-            {"title": "💼 Placement Info", "payload": "/ask_placement"},
-            {"title": "🎓 Scholarships", "payload": "/ask_scholarships"}
-        ]
-
         dispatcher.utter_message(text=message, buttons=buttons)
 
         return []
@@ -76,6 +254,7 @@ class ActionCourseInfo(Action):
     def name(self):
         return "action_course_info"
 
+    @traced_action
     def run(
         self,
         dispatcher: CollectingDispatcher,
@@ -111,6 +290,28 @@ class ActionCourseInfo(Action):
         if score >= 70:
             course = courses[best_match]
             
+            # Suggestion buttons
+            buttons = [
+                {"title": "💼 Career & Salary", "payload": "/request_career_info"},
+                {"title": "🧭 Is This Right for Me?", "payload": "/start_course_advisor"},
+                {"title": "📊 Compare Courses", "payload": "/view_courses"},
+                {"title": "🔗 Similar Courses", "payload": "/ask_similar_courses"},
+                {"title": "✅ I'm Interested", "payload": "/ask_contact"},
+                {"title": "🎓 Scholarships", "payload": "/ask_scholarships"}
+            ]
+            events = [SlotSet("viewed_course", course['course_name'])]
+
+            if wants_structured(tracker):
+                send_structured(
+                    dispatcher, "course_info", buttons,
+                    course=course_payload(
+                        course,
+                        ("description", "duration", "fees", "suitable_for", "key_skills"),
+                        skills_limit=5
+                    )
+                )
+                return events
+
             # Extract key skills (first 5)
             skills_list = course.get('key_skills', '').split('|')[:5]
             skills_text = '<br>• '.join(skills_list)
@@ -124,17 +325,10 @@ class ActionCourseInfo(Action):
                 f"<b>🔑 Key Skills:</b><br>• {skills_text}<br><br>"
                 f"💡 <b>What would you like to know?</b>"
             )
-            
-            # Suggestion buttons
-            buttons = [
-                {"title": "💼 Career & Salary", "payload": "/request_career_info"},
-                {"title": "🧭 Is This Right for Me?", "payload": "/start_course_advisor"},
-                {"title": "📊 Compare Courses", "payload": "/view_courses"},
-                {"title": "✅ I'm Interested", "payload": "/ask_contact"},
-                {"title": "🎓 Scholarships", "payload": "/ask_scholarships"}
-            ]
 
         else:
+            events = []
+
             # Course not found - show helpful options
             response = (
                 "❌ I couldn't identify that course.<br><br>"
@@ -155,7 +349,7 @@ class ActionCourseInfo(Action):
 
         dispatcher.utter_message(text=response, buttons=buttons)
 
-        return []
+        return events
 
 
 class ActionCompareCourses(Action):
@@ -164,6 +358,7 @@ class ActionCompareCourses(Action):
     def name(self):
         return "action_compare_courses"
     
+    @traced_action
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: dict):
@@ -184,6 +379,22 @@ class ActionCompareCourses(Action):
             dispatcher.utter_message(text="No courses available.")
             return []
         
+        buttons = [
+            {"title": "🧭 Find My Perfect Match", "payload": "/start_course_advisor"},
+            {"title": "🔍 Search Specific Course", "payload": "tell me about"},
+            {"title": "📞 Talk to Counselor", "payload": "/ask_contact"}
+        ]
+        
+        if wants_structured(tracker):
+            send_structured(
+                dispatcher, "course_comparison", buttons,
+                courses=[
+                    course_payload(course, ("duration", "fees", "level", "salary"))
+                    for course in courses
+                ]
+            )
+            return []
+        
         # Build comparison table
         message = "<b>📊 Course Comparison</b><br><br>"
         
@@ -201,12 +412,6 @@ class ActionCompareCourses(Action):
         
         message += "💡 <b>Need help deciding?</b>"
         
-        buttons = [
-            {"title": "🧭 Find My Perfect Match", "payload": "/start_course_advisor"},
-            {"title": "🔍 Search Specific Course", "payload": "tell me about"},
-            {"title": "📞 Talk to Counselor", "payload": "/ask_contact"}
-        ]
-        
         dispatcher.utter_message(text=message, buttons=buttons)
         
         return []
@@ -217,6 +422,7 @@ class ActionRecommendCourse(Action):
     def name(self) -> Text:
         return "action_recommend_course"
     
+    @traced_action
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -276,6 +482,38 @@ class ActionRecommendCourse(Action):
         # Generate simplified response
         match_level = "Excellent" if top_score >= 80 else "Great" if top_score >= 60 else "Good"
         
+        # viewed_course always tracks the course shown last (used for "similar courses")
+        events = [
+            SlotSet("recommended_course", top_course['course_name']),
+            SlotSet("viewed_course", top_course['course_name'])
+        ]
+        
+        buttons = [
+            {"title": "📖 Full Course Details", "payload": "/request_more_info"},
+            {"title": "💼 Career & Salary Info", "payload": "/request_career_info"},
+            {"title": "📊 Compare Courses", "payload": "/view_courses"},
+            {"title": "📞 Contact ICTAK", "payload": "/ask_contact"}
+        ]
+        
+        if wants_structured(tracker):
+            alternative = None
+            if second_course and (top_score - second_score) < 20:
+                alternative = dict(course_payload(second_course), score=second_score)
+            
+            send_structured(
+                dispatcher, "recommendation", buttons,
+                course=course_payload(
+                    top_course,
+                    ("duration", "fees", "suitable_for", "key_skills"),
+                    skills_limit=5
+                ),
+                score=top_score,
+                match_level=match_level,
+                reasons=self.get_reasons(interest, career_role, experience, goal),
+                alternative=alternative
+            )
+            return events
+        
         # Extract key skills (first 5)
         skills_list = top_course.get('key_skills', '').split('|')[:5]
         skills_text = '<br>• '.join(skills_list)
@@ -301,17 +539,9 @@ class ActionRecommendCourse(Action):
         
         message += "Want to know more about this course?"
         
-        dispatcher.utter_message(
-            text=message,
-            buttons=[
-                {"title": "📖 Full Course Details", "payload": "/request_more_info"},
-                {"title": "💼 Career & Salary Info", "payload": "/request_career_info"},
-                {"title": "📊 Compare Courses", "payload": "/view_courses"},
-                {"title": "📞 Contact ICTAK", "payload": "/ask_contact"}
-            ]
-        )
+        dispatcher.utter_message(text=message, buttons=buttons)
         
-        return [SlotSet("recommended_course", top_course['course_name'])]
+        return events
     
     def handle_unsure_user(self, dispatcher, experience, goal):
         """Handle users who are unsure about both interest and role"""
@@ -485,6 +715,15 @@ class ActionRecommendCourse(Action):
     
     def get_reasoning(self, interest, career_role, experience, goal):
         """Generate human-readable reasoning"""
+        reasons = self.get_reasons(interest, career_role, experience, goal)
+        
+        if not reasons:
+            return "Excellent match based on your profile"
+        
+        return '<br>'.join(reasons)
+    
+    def get_reasons(self, interest, career_role, experience, goal):
+        """List the individual reasons behind a recommendation"""
         reasons = []
         
         if interest and 'unsure' not in interest.lower():
@@ -513,10 +752,7 @@ class ActionRecommendCourse(Action):
             goal_text = goal_mapping.get(goal, 'your learning goals')
             reasons.append(f"✓ Perfect for {goal_text}")
         
-        if not reasons:
-            return "Excellent match based on your profile"
-        
-        return '<br>'.join(reasons)
+        return reasons
 
 
 class ActionShowDetailedRecommendation(Action):
@@ -525,6 +761,7 @@ class ActionShowDetailedRecommendation(Action):
     def name(self) -> Text:
         return "action_show_detailed_recommendation"
     
+    @traced_action
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -543,6 +780,24 @@ class ActionShowDetailedRecommendation(Action):
             for row in reader:
                 if row['course_name'].lower() == recommended_course.lower():
                     
+                    buttons = [
+                        {"title": "💼 Career & Salary Info", "payload": "/request_career_info"},
+                        {"title": "🔗 Similar Courses", "payload": "/ask_similar_courses"},
+                        {"title": "📞 Contact Admissions", "payload": "/ask_contact"},
+                        {"title": "📊 Compare Courses", "payload": "/view_courses"}
+                    ]
+                    events = [SlotSet("viewed_course", row['course_name'])]
+                    
+                    if wants_structured(tracker):
+                        send_structured(
+                            dispatcher, "course_details", buttons,
+                            course=course_payload(
+                                row,
+                                ("description", "duration", "fees", "suitable_for", "key_skills")
+                            )
+                        )
+                        return events
+                    
                     # Parse skills
                     skills_list = row.get('key_skills', '').split('|')
                     skills_formatted = '<br>• '.join(skills_list)
@@ -566,15 +821,8 @@ class ActionShowDetailedRecommendation(Action):
                         f"Ready to start your journey?"
                     )
                     
-                    dispatcher.utter_message(
-                        text=message,
-                        buttons=[
-                            {"title": "💼 Career & Salary Info", "payload": "/request_career_info"},
-                            {"title": "📞 Contact Admissions", "payload": "/ask_contact"},
-                            {"title": "📊 Compare Courses", "payload": "/view_courses"}
-                        ]
-                    )
-                    return []
+                    dispatcher.utter_message(text=message, buttons=buttons)
+                    return events
         
         dispatcher.utter_message(text="Course details not found.")
         return []
@@ -586,6 +834,7 @@ class ActionShowCareerInfo(Action):
     def name(self) -> Text:
         return "action_show_career_info"
     
+    @traced_action
     def run(self, dispatcher: CollectingDispatcher,
             tracker: Tracker,
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
@@ -604,6 +853,19 @@ class ActionShowCareerInfo(Action):
             for row in reader:
                 if row['course_name'].lower() == recommended_course.lower():
                     
+                    buttons = [
+                        {"title": "📖 View Full Course Details", "payload": "/request_more_info"},
+                        {"title": "📞 Talk to Career Counselor", "payload": "/ask_contact"},
+                        {"title": "✅ I'm Interested", "payload": "/ask_contact"}
+                    ]
+                    
+                    if wants_structured(tracker):
+                        send_structured(
+                            dispatcher, "career_info", buttons,
+                            course=course_payload(row, ("career_paths", "salaries"))
+                        )
+                        return []
+                    
                     # Parse career paths
                     careers_list = row.get('career_paths', '').split('|')
                     careers_formatted = '<br>• '.join(careers_list)
@@ -628,15 +890,81 @@ class ActionShowCareerInfo(Action):
                         f"throughout your job search!"
                     )
                     
-                    dispatcher.utter_message(
-                        text=message,
-                        buttons=[
-                            {"title": "📖 View Full Course Details", "payload": "/request_more_info"},
-                            {"title": "📞 Talk to Career Counselor", "payload": "/ask_contact"},
-                            {"title": "✅ I'm Interested", "payload": "/ask_contact"}
-                        ]
-                    )
+                    dispatcher.utter_message(text=message, buttons=buttons)
                     return []
         
         dispatcher.utter_message(text="Career information not found.")
+        return []
+
+
+class ActionShowSimilarCourses(Action):
+    """Suggest courses similar to the one the user is looking at"""
+    
+    def name(self) -> Text:
+        return "action_show_similar_courses"
+    
+    @traced_action
+    def run(self, dispatcher: CollectingDispatcher,
+            tracker: Tracker,
+            domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
+        
+        current_course = tracker.get_slot("viewed_course") or tracker.get_slot("recommended_course")
+        
+        if not current_course:
+            dispatcher.utter_message(
+                text="Pick a course first and I'll show you similar ones!",
+                buttons=[
+                    {"title": "📚 View All Courses", "payload": "/view_courses"},
+                    {"title": "🧭 Help Me Choose", "payload": "/start_course_advisor"}
+                ]
+            )
+            return []
+        
+        csv_path = os.path.join(os.path.dirname(__file__), "course_data.csv")
+        
+        if not os.path.exists(csv_path):
+            dispatcher.utter_message(text="⚠️ Course database not found.")
+            return []
+        
+        similar = get_similarity_index(csv_path).get(current_course.lower())
+        
+        if not similar:
+            dispatcher.utter_message(
+                text="I couldn't find courses similar to that one.",
+                buttons=[{"title": "📚 View All Courses", "payload": "/view_courses"}]
+            )
+            return []
+        
+        buttons = [
+            {"title": f"📖 {row['course_name']}", "payload": f"tell me about {row['course_name']}"}
+            for row, _ in similar
+        ]
+        buttons.append({"title": "📊 Compare Courses", "payload": "/view_courses"})
+        
+        if wants_structured(tracker):
+            send_structured(
+                dispatcher, "similar_courses", buttons,
+                course={"id": course_id(current_course), "name": current_course},
+                similar=[
+                    dict(course_payload(row, ("duration",)), score=round(score * 100))
+                    for row, score in similar
+                ]
+            )
+            return []
+        
+        items = []
+        for row, score in similar:
+            items.append(
+                f"<b>{row['course_name']}</b><br>"
+                f"🔗 {round(score * 100)}% similar | ⏱️ {row['duration']}"
+            )
+        
+        message = (
+            f"<b>🔗 Courses Similar to {current_course}</b><br><br>"
+            + "<br><br>".join(items)
+            + "<br><br>💡 Tap a course to learn more."
+        )
+        
+        dispatcher.utter_message(text=message, buttons=buttons)
+        
         return []
\ No newline at end of file
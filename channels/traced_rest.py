@@ -0,0 +1,24 @@
+"""
+REST channel that keeps the message metadata sent by the Flask bridge
+(trace id and send time) so custom actions can record their trace spans.
+Configured in credentials.yml.
+"""
+
+from typing import Any, Dict, Optional, Text
+
+from rasa.core.channels.rest import RestInput
+from sanic.request import Request
+
+
+class TracedRestInput(RestInput):
+    """Same as the built-in REST channel, but forwards message metadata"""
+
+    @classmethod
+    def name(cls) -> Text:
+        # Keep the /webhooks/rest/webhook URL used by web_app/app.py
+        return "rest"
+
+    def get_metadata(self, request: Request) -> Optional[Dict[Text, Any]]:
+        metadata = (request.json or {}).get("metadata")
+        # Only a JSON object is valid metadata; anything else is dropped
+        return metadata if isinstance(metadata, dict) else None
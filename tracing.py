@@ -0,0 +1,79 @@
+"""
+Request tracing shared by the Flask bridge and the action server.
+
+Spans from both processes are appended to one file in Chrome trace-event
+format (open it in chrome://tracing or ui.perfetto.dev to see a waterfall).
+Tracing is off unless TRACE_FILE is set, e.g. TRACE_FILE=trace.json.
+Relative paths are resolved against the project root so both processes
+write to the same file.
+"""
+
+import json
+import logging
+import os
+import zlib
+
+logger = logging.getLogger(__name__)
+
+# Empty = tracing disabled
+TRACE_FILE = os.getenv("TRACE_FILE", "")
+if TRACE_FILE:
+    TRACE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), TRACE_FILE)
+
+# When the trace file grows past this it is moved to <TRACE_FILE>.1
+TRACE_MAX_BYTES = int(os.getenv("TRACE_MAX_BYTES", 50 * 1024 * 1024))
+
+_named_file_id = None
+
+
+def tracing_enabled():
+    return bool(TRACE_FILE)
+
+
+def trace_track(trace_id):
+    """Stable track (tid) per trace id, so each turn gets its own row in both processes"""
+    return zlib.crc32(str(trace_id).encode("utf-8")) & 0x7fffffff
+
+
+def _rotate_if_full():
+    try:
+        if os.path.getsize(TRACE_FILE) >= TRACE_MAX_BYTES:
+            os.replace(TRACE_FILE, TRACE_FILE + ".1")
+    except OSError:
+        pass
+
+
+def write_trace_spans(spans, process, category):
+    """Append (name, start, end, args) spans, times in epoch seconds"""
+    global _named_file_id
+
+    if not TRACE_FILE or not spans:
+        return
+
+    pid = os.getpid()
+    events = [
+        {
+            "name": name, "cat": category, "ph": "X",
+            "ts": int(start * 1e6), "dur": int(max(end - start, 0) * 1e6),
+            "pid": pid, "tid": trace_track(args.get("trace_id")), "args": args
+        }
+        for name, start, end, args in spans
+    ]
+
+    _rotate_if_full()
+
+    try:
+        with open(TRACE_FILE, "a", encoding="utf-8") as file:
+            stat = os.fstat(file.fileno())
+
+            # Label this process once per trace file (it changes on rotation)
+            if _named_file_id != (stat.st_dev, stat.st_ino):
+                events.insert(0, {"name": "process_name", "ph": "M", "pid": pid,
+                                  "args": {"name": process}})
+                _named_file_id = (stat.st_dev, stat.st_ino)
+
+            if file.tell() == 0:
+                file.write("[\n")
+            file.write("".join(json.dumps(event) + ",\n" for event in events))
+    except OSError as e:
+        logger.warning(f"Could not write trace spans to {TRACE_FILE}: {e}")
@@ -3,14 +3,237 @@ Updated Flask Backend with Button Support
 Save as: app.py
 """
 
-from flask import Flask, render_template, request, jsonify
+from flask import Flask, render_template, request, jsonify, g
+from werkzeug.security import safe_join
+import gzip
+import hashlib
+import os
+import re
+import sys
+import time
+import uuid
 import requests
 
+# tracing.py lives in the project root, shared with the action server
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from tracing import tracing_enabled, write_trace_spans  # noqa: E402
+
+try:
+    import brotli  # Optional - falls back to gzip when not installed
+except ImportError:
+    brotli = None
+
 app = Flask(__name__)
 
 # Rasa server URL
 RASA_SERVER_URL = "http://localhost:5005/webhooks/rest/webhook"
 
+# Only compress /chat responses bigger than this (bytes)
+COMPRESSION_MIN_SIZE = 500
+COMPRESSION_LEVEL = 6
+
+# Static assets requested with a matching ?v=<hash> never change
+STATIC_MAX_AGE = 31536000  # 1 year
+
+_static_hashes = {}
+
+# X-Request-ID / X-Request-Start are only trusted from these proxy addresses
+# (comma-separated), e.g. TRUSTED_PROXIES=127.0.0.1
+TRUSTED_PROXIES = {ip.strip() for ip in os.getenv("TRUSTED_PROXIES", "").split(",") if ip.strip()}
+
+REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Proxy start times older than this (seconds) are treated as bogus
+MAX_QUEUE_TIME = 60
+
+
+def parse_request_start(header, now):
+    """Parse an X-Request-Start header (set by a proxy) into epoch seconds"""
+    try:
+        value = float(header.replace('t=', '').strip())
+    except (AttributeError, ValueError):
+        return None
+
+    # Proxies send seconds, milliseconds or microseconds
+    if value > 1e14:
+        value /= 1e6
+    elif value > 1e11:
+        value /= 1e3
+
+    # Ignore start times in the future or implausibly far in the past
+    if not now - MAX_QUEUE_TIME <= value <= now:
+        return None
+    return value
+
+
+def trace_span(name, start, end=None, **args):
+    """Remember a span for the current request (written when it finishes)"""
+    if 'trace_spans' in g:
+        args['trace_id'] = g.trace_id
+        g.trace_spans.append((name, start, end or time.time(), args))
+
+
+@app.before_request
+def start_trace():
+    if request.path != '/chat' or not tracing_enabled():
+        return
+
+    now = time.time()
+    trace_id = request_start = None
+
+    # Reuse a trusted proxy's request id so its logs line up with the trace
+    if request.remote_addr in TRUSTED_PROXIES:
+        trace_id = request.headers.get('X-Request-ID', '')
+        if not REQUEST_ID_PATTERN.match(trace_id):
+            trace_id = None
+        request_start = parse_request_start(request.headers.get('X-Request-Start'), now)
+
+    g.trace_id = trace_id or uuid.uuid4().hex
+    g.trace_start = request_start or now
+    g.trace_received = now
+    g.trace_spans = []
+
+    # Queueing is only measurable when a proxy told us when it got the request
+    if request_start:
+        trace_span("bridge queueing", request_start, now)
+
+
+@app.after_request
+def finish_trace(response):
+    # Registered first so it runs after compression and sees the final size
+    if 'trace_spans' not in g:
+        return response
+
+    # Ends here so it includes compression done in compress_chat_response
+    if 'trace_format_start' in g:
+        trace_span("response formatting", g.trace_format_start)
+
+    trace_span("bridge /chat", g.trace_start,
+               status=response.status_code, bytes=response.content_length)
+    write_trace_spans(g.trace_spans, "flask bridge", "bridge")
+    response.headers['X-Request-ID'] = g.trace_id
+    return response
+
+
+def static_file_hash(filename):
+    """Return a short content hash for a static file (cached per mtime)"""
+    # Never follow paths that escape the static folder
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return None
+
+    cached = _static_hashes.get(filename)
+    if cached and cached[0] == mtime:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(65536), b""):
+            digest.update(chunk)
+    digest = digest.hexdigest()[:12]
+
+    _static_hashes[filename] = (mtime, digest)
+    return digest
+
+
+@app.url_defaults
+def add_static_hash(endpoint, values):
+    # url_for('static', filename=...) -> /static/<file>?v=<content hash>
+    if endpoint == 'static' and 'filename' in values and 'v' not in values:
+        digest = static_file_hash(values['filename'])
+        if digest:
+            values['v'] = digest
+
+
+def choose_encoding(accept_encoding):
+    """Pick the highest-q supported encoding the client accepts (br wins ties)"""
+    accepted = {}
+    for part in accept_encoding.split(','):
+        pieces = part.strip().split(';')
+        name = pieces[0].strip().lower()
+        quality = 1.0
+        for param in pieces[1:]:
+            param = param.strip()
+            if param.startswith('q='):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            accepted[name] = quality
+
+    supported = ['br', 'gzip'] if brotli is not None else ['gzip']
+
+    best, best_quality = None, 0.0
+    for encoding in supported:
+        # '*' covers any supported encoding the client didn't name
+        quality = accepted.get(encoding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+@app.after_request
+def compress_chat_response(response):
+    if request.path != '/chat':
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if (response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or (response.content_length is not None
+                and response.content_length < COMPRESSION_MIN_SIZE)):
+        return response
+
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESSION_MIN_SIZE:
+        return response
+
+    compress_start = time.time()
+    if encoding == 'br':
+        data = brotli.compress(data)
+    else:
+        data = gzip.compress(data, compresslevel=COMPRESSION_LEVEL)
+    trace_span("compression", compress_start, encoding=encoding)
+
+    response.set_data(data)
+    response.headers['Content-Encoding'] = encoding
+    return response
+
+
+@app.after_request
+def cache_static_assets(response):
+    # Only successful static responses (304 = revalidated) get cache headers
+    if request.endpoint != 'static' or response.status_code not in (200, 304):
+        return response
+
+    # Flask already adds ETag / Last-Modified and answers 304s for static files
+    filename = (request.view_args or {}).get('filename')
+    version = request.args.get('v')
+
+    if version and filename and version == static_file_hash(filename):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = STATIC_MAX_AGE
+        response.cache_control.immutable = True
+    else:
+        # Unversioned URL - let the browser revalidate with the ETag
+        response.cache_control.no_cache = True
+        response.cache_control.max_age = None
+
+    return response
+
+
 @app.route('/')
 def home():
     return render_template('index.html')
@@ -28,10 +251,30 @@ def chat():
             "sender": "user",  # You can use session ID here
             "message": user_message
         }
+        metadata = {}
+        
+        # The web page renders structured payloads with static/chat_templates.js
+        if request.json.get('structured') is True:
+            metadata["structured"] = True
+        
+        # Trace context is carried to the action server in message metadata
+        if 'trace_spans' in g:
+            sent_at = time.time()
+            trace_span("request parsing", g.trace_received, sent_at)
+            metadata.update({"trace_id": g.trace_id, "trace_sent_at": sent_at})
+        
+        if metadata:
+            payload["metadata"] = metadata
         
-        response = requests.post(RASA_SERVER_URL, json=payload, timeout=10)
-        response.raise_for_status()
+        try:
+            rasa_start = time.time()
+            response = requests.post(RASA_SERVER_URL, json=payload, timeout=10)
+            response.raise_for_status()
+        finally:
+            trace_span("rasa webhook", rasa_start)
         
+        if 'trace_spans' in g:
+            g.trace_format_start = time.time()
         rasa_responses = response.json()
         
         # Rasa returns a list of responses
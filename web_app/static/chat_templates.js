@@ -0,0 +1,144 @@
+/*
+ * Client-side templates for structured ("custom") bot messages.
+ * This page asks for them ("structured": true in each /chat request) and the
+ * action server then sends compact JSON; the static markup lives here so the
+ * browser downloads and caches it once. Other channels still get text.
+ */
+
+const ChatTemplates = (function () {
+  const SPECIAL_FEATURES = [
+    "100% Placement Assistance for eligible candidates",
+    "Scholarships and Cash-backs for meritorious students",
+    "3-6 month access to LinkedIn Learning",
+    "Comprehensive Employability Skills training",
+    "Expert sessions by Industry Professionals",
+    "Online and Offline sessions available"
+  ];
+
+  function esc(value) {
+    return String(value == null ? "" : value)
+      .replace(/&/g, "&amp;")
+      .replace(/</g, "&lt;")
+      .replace(/>/g, "&gt;")
+      .replace(/"/g, "&quot;");
+  }
+
+  function bullets(items) {
+    return (items || []).map(item => `• ${esc(item)}`).join("<br>");
+  }
+
+  const templates = {
+    course_list(data) {
+      const items = data.courses.map((course, idx) =>
+        `${idx + 1}. <b>${esc(course.name)}</b><br>` +
+        `   ⏱️ ${esc(course.duration)} | 📊 ${esc(course.level)}`
+      );
+      return (
+        "<b>📚 Available Courses at ICTAK</b><br><br>" +
+        items.join("<br><br>") + "<br><br>" +
+        "💡 <b>What would you like to do next?</b>"
+      );
+    },
+
+    course_info(data) {
+      const course = data.course;
+      return (
+        `<b>📚 ${esc(course.name)}</b><br><br>` +
+        `<b>📖 Description:</b><br>${esc(course.description)}<br><br>` +
+        `<b>⏱️ Duration:</b> ${esc(course.duration)}<br>` +
+        `<b>💰 Fees:</b> ${esc(course.fees)}<br>` +
+        `<b>📊 Suitable For:</b> ${esc(course.suitable_for.join(", "))}<br><br>` +
+        `<b>🔑 Key Skills:</b><br>${bullets(course.key_skills)}<br><br>` +
+        "💡 <b>What would you like to know?</b>"
+      );
+    },
+
+    course_comparison(data) {
+      const items = data.courses.map(course =>
+        `<b>${esc(course.name)}</b><br>` +
+        `⏱️ Duration: ${esc(course.duration)}<br>` +
+        `💰 Fees: ${esc(course.fees)}<br>` +
+        `📊 Level: ${esc(course.level)}<br>` +
+        `💼 Salary: ${esc(course.salary)}<br><br>`
+      );
+      return "<b>📊 Course Comparison</b><br><br>" + items.join("") +
+        "💡 <b>Need help deciding?</b>";
+    },
+
+    recommendation(data) {
+      const course = data.course;
+      const reasons = data.reasons && data.reasons.length
+        ? data.reasons.map(esc).join("<br>")
+        : "Excellent match based on your profile";
+      let html = (
+        "<b>🎯 Your Personalized Recommendation</b><br><br>" +
+        `<b>📚 ${esc(course.name)}</b><br>` +
+        `✅ Match Score: ${esc(data.score)}% - ${esc(data.match_level)} fit!<br><br>` +
+        `<b>Why this course?</b><br>${reasons}<br><br>` +
+        `<b>⏱️ Duration:</b> ${esc(course.duration)}<br>` +
+        `<b>💰 Fees:</b> ${esc(course.fees)}<br>` +
+        `<b>📊 Level:</b> ${esc(course.suitable_for.join(", "))}<br><br>` +
+        `<b>🔑 Key Skills:</b><br>${bullets(course.key_skills)}<br><br>`
+      );
+      if (data.alternative) {
+        html += `<b>💡 Alternative:</b> ${esc(data.alternative.name)} ` +
+          `(${esc(data.alternative.score)}% match)<br><br>`;
+      }
+      return html + "Want to know more about this course?";
+    },
+
+    course_details(data) {
+      const course = data.course;
+      return (
+        "<b>📚 Complete Course Details</b><br>" +
+        `<b>${esc(course.name)}</b><br><br>` +
+        `<b>📖 Description:</b><br>${esc(course.description)}<br><br>` +
+        `<b>⏱️ Duration:</b> ${esc(course.duration)}<br>` +
+        `<b>💰 Fees:</b> ${esc(course.fees)}<br>` +
+        `<b>📊 Suitable For:</b> ${esc(course.suitable_for.join(", "))}<br><br>` +
+        `<b>🎯 Key Skills Covered:</b><br>${bullets(course.key_skills)}<br><br>` +
+        `<b>✨ What Makes This Course Special:</b><br>${bullets(SPECIAL_FEATURES)}<br><br>` +
+        "Ready to start your journey?"
+      );
+    },
+
+    similar_courses(data) {
+      const items = data.similar.map(course =>
+        `<b>${esc(course.name)}</b><br>` +
+        `🔗 ${esc(course.score)}% similar | ⏱️ ${esc(course.duration)}`
+      );
+      return (
+        `<b>🔗 Courses Similar to ${esc(data.course.name)}</b><br><br>` +
+        items.join("<br><br>") +
+        "<br><br>💡 Tap a course to learn more."
+      );
+    },
+
+    career_info(data) {
+      const course = data.course;
+      return (
+        "<b>💼 Career Opportunities & Salary Information</b><br>" +
+        `<b>${esc(course.name)}</b><br><br>` +
+        `<b>🎯 Career Paths:</b><br>${bullets(course.career_paths)}<br><br>` +
+        `<b>💵 Expected Salary Ranges:</b><br>${bullets(course.salaries)}<br><br>` +
+        "<b>📈 Career Growth:</b><br>" +
+        "• Entry Level: Start as Junior/Associate roles<br>" +
+        "• Mid Level (2-4 years): Senior positions<br>" +
+        "• Advanced (5+ years): Lead/Architect roles<br><br>" +
+        "<b>🌟 Industry Demand:</b><br>" +
+        "High demand across IT, Banking, Healthcare, E-commerce, " +
+        "Consulting, and Government sectors.<br><br>" +
+        "💡 With ICTAK's 100% placement assistance, you'll have support " +
+        "throughout your job search!"
+      );
+    }
+  };
+
+  // Returns HTML for a known payload type, or null so callers can fall back
+  function render(custom) {
+    if (!custom || !templates[custom.type]) return null;
+    return templates[custom.type](custom);
+  }
+
+  return { render };
+})();